@@ -12,10 +12,18 @@ from homeassistant.helpers.device_registry import DeviceEntry
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from .coordinator import ZendureCoordinator
+from .services import async_setup_services
+from .websocket_api import async_setup_websocket
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.SELECT, Platform.SENSOR]
+PLATFORMS: list[Platform] = [
+    Platform.BINARY_SENSOR,
+    Platform.NUMBER,
+    Platform.SELECT,
+    Platform.SENSOR,
+    Platform.SWITCH,
+]
 
 type MyConfigEntry = ConfigEntry[RuntimeData]
 
@@ -39,6 +47,8 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: MyConfigEntry) ->
         raise ConfigEntryNotReady
 
     await coordinator.async_config_entry_first_refresh()
+    async_setup_services(hass)
+    async_setup_websocket(hass)
 
     config_entry.async_on_unload(
         config_entry.add_update_listener(_async_update_listener)
@@ -70,4 +80,7 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: MyConfigEntry) -
     # If you have created any custom services, they need to be removed here too.
 
     # Unload platforms and return result
-    return await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
\ No newline at end of file
+    unloaded = await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
+    if unloaded:
+        await config_entry.runtime_data.coordinator.api.async_close()
+    return unloaded
\ No newline at end of file
@@ -1,13 +1,18 @@
 import logging
 import json
+import time
 from enum import StrEnum
+from typing import Any
 from paho.mqtt import client as mqtt_client
 from base64 import b64decode
 
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import config_validation as cv, entity_platform, service
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from .hyper2000 import Hyper2000
+from .device import ZendureDevice
+from .ingress import IngressQueue
+from .schema import CATALOG, MODELS
+from .worker import WorkerClient
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,7 +22,7 @@ SF_API_BASE_URL = "https://app.zendure.tech"
 class API:
     """Class for Zendure API."""
 
-    def __init__(self, hass: HomeAssistant, zen_api, username, password):
+    def __init__(self, hass: HomeAssistant, zen_api, username, password, use_worker: bool = False):
         self.hass = hass
         self.baseUrl = f"{SF_API_BASE_URL}"
         self.zen_api = zen_api
@@ -26,8 +31,14 @@ class API:
         self.session = None
         self.token: str = None
         self.mqttUrl: str = None
-        self.hypers: dict[str, Hyper2000] = {}
+        self.hypers: dict[str, ZendureDevice] = {}
+        self.deviceids: dict[str, str] = {}
+        # devices missing from the previous device list, removed when still missing in the next one
+        self.missing: set[str] = set()
         self.clients: dict[str, mqtt_client] = {}
+        self.ingress = IngressQueue(hass)
+        self.use_worker = use_worker
+        self.worker: WorkerClient | None = None
 
     async def connect(self) -> bool:
         _LOGGER.info("Connecting to Zendure")
@@ -78,70 +89,143 @@ class API:
         self.session = None
 
     async def getHypers(self, hass: HomeAssistant):
-        SF_DEVICELIST_PATH = "/productModule/device/queryDeviceListByConsumerId"
-        SF_DEVICEDETAILS_PATH = "/device/solarFlow/detail"
-        self.hypers: dict[str, Hyper2000] = {}
+        self.hypers: dict[str, ZendureDevice] = {}
+        self.deviceids: dict[str, str] = {}
         try:
             if self.session is None:
                 await self.connect()
 
-            cloud = self.mqtt(
-                self.token,
-                "zenApp",
-                b64decode("SDZzJGo5Q3ROYTBO".encode()).decode("latin-1"),
-            )
+            password = b64decode("SDZzJGo5Q3ROYTBO".encode()).decode("latin-1")
+            if self.use_worker:
+                # receive and decode the messages in a separate process
+                self.worker = WorkerClient(
+                    {"host": self.mqttUrl, "client_id": self.token, "username": "zenApp", "password": password},
+                    self.onReports,
+                    self.onBattery,
+                )
+                await self.worker.async_start()
+                cloud = self.worker
+            else:
+                cloud = self.mqtt(self.token, "zenApp", password)
             self.clients["cloud"] = cloud
 
-            url = f"{self.zen_api}{SF_DEVICELIST_PATH}"
-            _LOGGER.info("Getting device list ...")
+            if (devices := await self.getDeviceList()) is not None:
+                for dev in devices.values():
+                    await self.addDevice(hass, dev)
+        except Exception as e:
+            _LOGGER.exception(e)
+
+    async def getDeviceList(self) -> dict[str, dict] | None:
+        """Return the supported devices of the account by their id, None when the list is not available."""
+        SF_DEVICELIST_PATH = "/productModule/device/queryDeviceListByConsumerId"
+        url = f"{self.zen_api}{SF_DEVICELIST_PATH}"
+        _LOGGER.info("Getting device list ...")
+
+        response = await self.session.post(url=url, headers=self.headers)
+        if not response.ok:
+            _LOGGER.error("Fetching device list failed!")
+            _LOGGER.error(response.text)
+            return None
 
-            response = await self.session.post(url=url, headers=self.headers)
+        respJson = await response.json()
+        devices: dict[str, dict] = {}
+        for dev in respJson["data"]:
+            _LOGGER.debug(f"prodname: {dev['productName']}")
+            if dev.get("productKey", None) in CATALOG or dev["productName"] in MODELS.values():
+                devices[str(dev["id"])] = dev
+        return devices
+
+    async def addDevice(self, hass: HomeAssistant, dev: dict) -> ZendureDevice | None:
+        """Fetch the details of a device from the list and subscribe to its topics."""
+        SF_DEVICEDETAILS_PATH = "/device/solarFlow/detail"
+        try:
+            h: ZendureDevice = None
+            payload = {"deviceId": dev["id"]}
+            url = f"{self.zen_api}{SF_DEVICEDETAILS_PATH}"
+            _LOGGER.info(f"Getting device details for [{dev['id']}] ...")
+            response = await self.session.post(url=url, json=payload, headers=self.headers)
             if response.ok:
                 respJson = await response.json()
-                devices = respJson["data"]
-                for dev in devices:
-                    _LOGGER.debug(f"prodname: {dev['productName']}")
-                    if dev["productName"] == "Hyper 2000":
-                        try:
-                            h: Hyper2000 = None
-                            payload = {"deviceId": dev["id"]}
-                            url = f"{self.zen_api}{SF_DEVICEDETAILS_PATH}"
-                            _LOGGER.info(f"Getting device details for [{dev['id']}] ...")
-                            response = await self.session.post(url=url, json=payload, headers=self.headers)
-                            if response.ok:
-                                respJson = await response.json()
-                                data = respJson["data"]
-                                h = Hyper2000(
-                                    hass,
-                                    data["deviceKey"],
-                                    data["productKey"],
-                                    data["deviceName"],
-                                    data,
-                                )
-                                if h.hid:
-                                    _LOGGER.info(f"Hyper: [{h.hid}]")
-                                    self.hypers[data["deviceKey"]] = h
-                                    _LOGGER.info(f"Data: {data}")
-                                    cloud.subscribe(f"/{h.prodkey}/{h.hid}/#")
-                                    cloud.subscribe(f"iot/{h.prodkey}/{h.hid}/#")
-                                else:
-                                    _LOGGER.info(f"Hyper: [??]")
-                            else:
-                                _LOGGER.error("Fetching device details failed!")
-                                _LOGGER.error(response.text)
-                        except Exception as e:
-                            _LOGGER.exception(e)
+                data = respJson["data"]
+                h = ZendureDevice(
+                    hass,
+                    data["deviceKey"],
+                    data["productKey"],
+                    data["deviceName"],
+                    data,
+                )
+                if h.hid and h.catalog:
+                    _LOGGER.info(f"{h.model}: [{h.hid}]")
+                    cloud = self.clients["cloud"]
+                    self.hypers[data["deviceKey"]] = h
+                    self.deviceids[str(dev["id"])] = h.hid
+                    h.client = cloud
+                    _LOGGER.info(f"Data: {data}")
+                    cloud.subscribe(f"/{h.prodkey}/{h.hid}/#")
+                    cloud.subscribe(f"iot/{h.prodkey}/{h.hid}/#")
+                    return h
+                _LOGGER.info(f"Unsupported device: [{data['productKey']}] {data['deviceName']}")
             else:
-                _LOGGER.error("Fetching device list failed!")
+                _LOGGER.error("Fetching device details failed!")
                 _LOGGER.error(response.text)
         except Exception as e:
             _LOGGER.exception(e)
+        return None
+
+    async def removeDevice(self, deviceid: str) -> ZendureDevice | None:
+        """Unsubscribe a device and remove its entities."""
+        if (h := self.hypers.pop(self.deviceids.pop(deviceid, None), None)) is None:
+            return None
+        _LOGGER.info(f"Remove {h.model}: [{h.hid}]")
+        cloud = self.clients["cloud"]
+        cloud.unsubscribe(f"/{h.prodkey}/{h.hid}/#")
+        cloud.unsubscribe(f"iot/{h.prodkey}/{h.hid}/#")
+        await h.async_remove()
+        return h
+
+    async def resync(self, hass: HomeAssistant) -> tuple[list[ZendureDevice], list[ZendureDevice]]:
+        """Update the devices to the device list of the account.
+
+        Only the details of new devices are fetched, the entities of the other
+        devices are left alone. A device is only removed when it is missing from two
+        consecutive device lists, removing it also deletes its registry entries and
+        a single incomplete response should not do that. Returns the added and
+        removed devices.
+        """
+        added: list[ZendureDevice] = []
+        removed: list[ZendureDevice] = []
+        try:
+            if (devices := await self.getDeviceList()) is None:
+                return added, removed
+            missing = {d for d in self.deviceids if d not in devices}
+            for deviceid in missing & self.missing:
+                if h := await self.removeDevice(deviceid):
+                    removed.append(h)
+            self.missing = {d for d in missing if d in self.deviceids}
+            for deviceid, dev in devices.items():
+                if deviceid not in self.deviceids and (h := await self.addDevice(hass, dev)):
+                    h.create_entities()
+                    self.clients["cloud"].publish(h._topic_read, '{"properties": ["getAll"]}')
+                    added.append(h)
+        except Exception as e:
+            _LOGGER.exception(e)
+        return added, removed
+
+    async def async_close(self) -> None:
+        """Stop the mqtt clients and the ingestion worker."""
+        if self.worker is not None:
+            await self.worker.async_stop()
+            self.worker = None
+        elif client := self.clients.get("cloud", None):
+            client.loop_stop()
+            client.disconnect()
+        self.clients = {}
 
     def initialize(self):
         _LOGGER.info("init hypers")
         try:
             for k, h in self.hypers.items():
-                h.create_sensors()
+                h.create_entities()
 
         except Exception as err:
             _LOGGER.error(err)
@@ -155,10 +239,11 @@ class API:
         except Exception as err:
             _LOGGER.error(err)
 
-    def update_outpower(self, h: Hyper2000, outpower: int) -> None:
+    def update_outpower(self, h: ZendureDevice, outpower: int) -> None:
         try:
             _LOGGER.info("Update consumption")
             cloud = self.clients["cloud"]
+            outpower = min(800, max(outpower, 0))
 
             power = json.dumps(
                 {
@@ -167,7 +252,7 @@ class API:
                     "arguments": [
                         {
                             "autoModelProgram": 1,
-                            "autoModelValue": {"outPower": min(800, max(outpower, 0))},
+                            "autoModelValue": {"outPower": outpower},
                             "msgType": 1,
                             "autoModel": 8,
                         }
@@ -175,9 +260,10 @@ class API:
                 },
                 default=lambda o: o.__dict__,
             )
-            _LOGGER.info(f"Update power: {min(800, max(outpower, 0))}")
+            _LOGGER.info(f"Update power: {outpower}")
 
             cloud.publish(h.topic_function, power)
+            h.outpower = outpower
         except Exception as err:
             _LOGGER.error(err)
 
@@ -206,6 +292,27 @@ class API:
     def onDisconnect(self, _client, userdata, rc):
         _LOGGER.info(f"Client has been disconnected")
 
+    def onReports(self, reports: dict[str, list]) -> None:
+        """Queue the delta batches from the ingestion worker.
+
+        The worker already dropped the duplicate and out of order values, the batch
+        timestamp is not used to order them again.
+        """
+        now = time.time()
+        for deviceid, (_, properties) in reports.items():
+            if hyper := self.hypers.get(deviceid, None):
+                if properties:
+                    self.ingress.put(hyper, properties, now)
+                else:
+                    # nothing changed, the values are still as recent as the report
+                    hyper.alive(now)
+
+    def onBattery(self, batteries: dict[str, Any]) -> None:
+        """Update the battery information from the ingestion worker."""
+        for deviceid, data in batteries.items():
+            if hyper := self.hypers.get(deviceid, None):
+                hyper.update_battery(data)
+
     def onMessage(self, client, userdata, msg):
         try:
             payload = json.loads(msg.payload.decode())
@@ -213,21 +320,9 @@ class API:
             if parameter == "report":
                 deviceid = payload["deviceId"]
                 if (properties := payload.get("properties", None)) and (hyper := self.hypers.get(deviceid, None)):
-                    try:
-                        for key, value in properties.items():
-                            if sensor := hyper.sensors.get(key, None):
-                                try:
-                                    self.hass.loop.call_soon_threadsafe(sensor.update_value, value)
-                                    sensor.update_value(value)
-                                except Exception as err:
-                                    _LOGGER.error(f"Error value: {deviceid} {err} {key} => {value}")
-                            elif isinstance(value, (int, float)):
-                                self.hass.loop.call_soon_threadsafe(hyper.onAddSensor, key)
-                            else:
-                                _LOGGER.info(f"Found unknown state value:  {deviceid} {key} => {value}")
-
-                    except Exception as err:
-                        _LOGGER.error(f"Error update: {err} {deviceid} => {payload}")
+                    self.ingress.put(
+                        hyper, properties, time.time(), payload.get("timestamp", None), payload.get("messageId", None)
+                    )
                 else:
                     _LOGGER.info(f"Found unknown state value: {deviceid} {msg.topic} {payload}")
             elif parameter == "log" and payload["logType"] == 2:
@@ -0,0 +1,187 @@
+"""Step-response measurement and controller tuning for the Zendure power controller."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict, dataclass
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, SIGNAL_PROPERTY_UPDATE
+from .device import ZendureDevice
+from .stats import LatencyStats
+
+if TYPE_CHECKING:
+    from .api import API
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.tuning"
+
+# fraction of the step which counts as the first effect of a command
+EFFECT_THRESHOLD = 0.1
+# fraction of the step reached after one time constant
+TAU_THRESHOLD = 0.632
+
+
+@dataclass
+class Tuning:
+    """Recommended power controller parameters for a device."""
+
+    delay: float
+    time_constant: float
+    process_gain: float
+    gain: float
+    min_interval: float
+
+
+class TuningStore:
+    """Persist the recommended controller parameters per device."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self._store = Store[dict[str, dict[str, float]]](hass, STORAGE_VERSION, STORAGE_KEY)
+        self.tunings: dict[str, Tuning] = {}
+
+    async def async_load(self) -> None:
+        if data := await self._store.async_load():
+            self.tunings = {hid: Tuning(**values) for hid, values in data.items()}
+
+    async def async_save(self, hid: str, tuning: Tuning) -> None:
+        self.tunings[hid] = tuning
+        await self._store.async_save({k: asdict(t) for k, t in self.tunings.items()})
+
+
+def fit_step(samples: list[tuple[float, float]], start: float, before: float) -> tuple[float, float, float] | None:
+    """Fit a first order plus dead time response to the samples of a single step.
+
+    The samples are (timestamp, value) reports after the command sent at start,
+    before is the value before the command. Returns (delay, time_constant, change)
+    or None when the device did not respond.
+    """
+    if not samples:
+        return None
+    final = samples[-1][1]
+    change = final - before
+    if abs(change) < 1:
+        return None
+
+    def reached(fraction: float) -> float | None:
+        return next((ts - start for ts, v in samples if (v - before) / change >= fraction), None)
+
+    delay = reached(EFFECT_THRESHOLD)
+    tau = reached(TAU_THRESHOLD)
+    if delay is None or tau is None:
+        return None
+    return delay, max(tau - delay, 0.0), change
+
+
+class StepTest:
+    """Run a step test on a device and derive the controller parameters.
+
+    The output power is switched between low and high for the number of steps,
+    every outputHomePower report is recorded with its timestamp and each step is
+    fitted to a first order response with dead time. Afterwards the output is
+    restored to the value reported before the test.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api: API,
+        hyper: ZendureDevice,
+        low: int,
+        high: int,
+        steps: int,
+        duration: float,
+        poll: float = 1.0,
+    ) -> None:
+        """Initialize the step test."""
+        self._hass = hass
+        self._api = api
+        self._hyper = hyper
+        self.low = low
+        self.high = high
+        self.steps = steps
+        self.duration = duration
+        self.poll = poll
+        self._samples: list[tuple[float, float]] = []
+
+    @callback
+    def _on_report(self, value: Any, timestamp: float) -> None:
+        if isinstance(value, (int, float)):
+            self._samples.append((timestamp, float(value)))
+
+    async def _async_step(self, target: int) -> tuple[float, list[tuple[float, float]]]:
+        """Command target and record the reports until duration has passed."""
+        self._samples = []
+        start = time.time()
+        self._api.update_outpower(self._hyper, target)
+        read = json.dumps({"properties": ["outputHomePower"]})
+        while (elapsed := time.time() - start) < self.duration:
+            # ask for the value, so the response is sampled at a known resolution
+            self._hyper.client.publish(self._hyper._topic_read, read)
+            await asyncio.sleep(min(self.poll, self.duration - elapsed))
+        return start, self._samples
+
+    async def async_run(self) -> dict[str, Any]:
+        _LOGGER.info(f"Step test {self._hyper.hid}: {self.low} - {self.high} W")
+        unsub = async_dispatcher_connect(
+            self._hass,
+            SIGNAL_PROPERTY_UPDATE.format(self._hyper.hid, "outputHomePower"),
+            self._on_report,
+        )
+        latency = LatencyStats()
+        fits: list[tuple[float, float, float]] = []
+        initial = self._hyper.properties.get("outputHomePower", None)
+        try:
+            _, samples = await self._async_step(self.low)
+            before = samples[-1][1] if samples else float(self._hyper.properties.get("outputHomePower", 0))
+            for step in range(self.steps):
+                target = self.high if step % 2 == 0 else self.low
+                start, samples = await self._async_step(target)
+                if fit := fit_step(samples, start, before):
+                    fits.append(fit)
+                    latency.add(fit[0])
+                    _LOGGER.info(f"Step {step} to {target} W: delay {fit[0]:.1f}s, tau {fit[1]:.1f}s")
+                else:
+                    _LOGGER.info(f"Step {step} to {target} W: no response")
+                before = samples[-1][1] if samples else before
+        finally:
+            unsub()
+            if isinstance(initial, (int, float)):
+                self._api.update_outpower(self._hyper, int(initial))
+
+        result: dict[str, Any] = {
+            "device": self._hyper.name,
+            "steps": len(fits),
+            "latency": latency.as_dict(),
+        }
+        if fits:
+            result["tuning"] = asdict(self.tuning(fits, latency))
+        return result
+
+    def tuning(self, fits: list[tuple[float, float, float]], latency: LatencyStats) -> Tuning:
+        """Derive the controller parameters with lambda tuning.
+
+        The closed loop time constant is the larger of delay and time constant,
+        new commands are only useful once the previous one has had its effect.
+        """
+        delay = sum(f[0] for f in fits) / len(fits)
+        tau = sum(f[1] for f in fits) / len(fits)
+        process_gain = sum(abs(f[2]) for f in fits) / len(fits) / abs(self.high - self.low)
+        closed_loop = max(delay, tau, 0.1)
+        return Tuning(
+            delay=round(delay, 2),
+            time_constant=round(tau, 2),
+            process_gain=round(process_gain, 3),
+            gain=round(min(1.0, max(tau, 0.1) / (process_gain * (closed_loop + delay))), 3),
+            min_interval=round(latency.percentile(95) + tau, 2),
+        )
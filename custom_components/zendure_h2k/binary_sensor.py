@@ -1,12 +1,13 @@
 """Interfaces with the Zendure Integration binairy sensors."""
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from .hyper2000 import Hyper2000
+from .device import ZendureDevice
 
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ):
-    Hyper2000.addBinarySensors = async_add_entities
+    ZendureDevice.addEntities[Platform.BINARY_SENSOR] = async_add_entities
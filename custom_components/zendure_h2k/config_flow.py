@@ -24,7 +24,17 @@ from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import selector
 
 from .api import API
-from .const import DEFAULT_SCAN_INTERVAL, DOMAIN, MIN_SCAN_INTERVAL, CONF_CONSUMED, CONF_PRODUCED
+from .const import (
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+    MIN_SCAN_INTERVAL,
+    CONF_CONSUMED,
+    CONF_METER_KEY,
+    CONF_METER_SIGNAL,
+    CONF_METER_TOPIC,
+    CONF_PRODUCED,
+    CONF_WORKER,
+)
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -180,6 +190,19 @@ class ZendureOptionsFlowHandler(OptionsFlow):
                     CONF_SCAN_INTERVAL,
                     default=self.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
                 ): (vol.All(vol.Coerce(int), vol.Clamp(min=MIN_SCAN_INTERVAL))),
+                vol.Optional(
+                    CONF_METER_TOPIC,
+                    description={"suggested_value": self.options.get(CONF_METER_TOPIC)},
+                ): str,
+                vol.Optional(
+                    CONF_METER_KEY,
+                    description={"suggested_value": self.options.get(CONF_METER_KEY)},
+                ): str,
+                vol.Optional(
+                    CONF_METER_SIGNAL,
+                    description={"suggested_value": self.options.get(CONF_METER_SIGNAL)},
+                ): str,
+                vol.Required(CONF_WORKER, default=self.options.get(CONF_WORKER, False)): bool,
             }
         )
 
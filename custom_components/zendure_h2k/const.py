@@ -4,6 +4,32 @@ DOMAIN = "zendure_h2k"
 
 CONF_CONSUMED = "consumed"
 CONF_PRODUCED = "produced"
+CONF_METER_TOPIC = "meter_topic"
+CONF_METER_KEY = "meter_key"
+CONF_METER_SIGNAL = "meter_signal"
+CONF_WORKER = "worker"
 
 DEFAULT_SCAN_INTERVAL = 90
 MIN_SCAN_INTERVAL = 10
+# Interval (seconds) to check the account for added or removed devices
+RESYNC_INTERVAL = 1800
+
+WRITE_BATCH_DELAY = 0.25
+
+# Maximum number of pending property values, and event loop lag (seconds)
+# above which non-critical values are dropped
+INGRESS_MAX_DEPTH = 5000
+INGRESS_SHED_LAG = 1.0
+
+# Number of messageIds remembered per device to drop duplicate reports
+MESSAGE_HISTORY = 32
+# Age (seconds) above which the power controller does not use a property value
+PROPERTY_MAX_AGE = 180
+
+# Dispatcher signals, formatted with the deviceKey (and property name)
+SIGNAL_DEVICE_UPDATE = f"{DOMAIN}_device_{{}}"
+SIGNAL_PROPERTY_UPDATE = f"{DOMAIN}_property_{{}}_{{}}"
+# Dispatcher signal for the reports of all devices, with (deviceKey, properties, timestamp)
+SIGNAL_FLEET_UPDATE = f"{DOMAIN}_fleet"
+# Dispatcher signal for the battery packs of all devices, with (deviceKey, batteries, timestamp)
+SIGNAL_BATTERY_UPDATE = f"{DOMAIN}_battery"
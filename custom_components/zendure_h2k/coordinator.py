@@ -1,8 +1,10 @@
 """Zendure Integration integration using DataUpdateCoordinator."""
 
-from dataclasses import dataclass
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
 from datetime import timedelta
 import logging
+import time
 
 from typing import Any
 from homeassistant.config_entries import ConfigEntry
@@ -13,20 +15,32 @@ from homeassistant.const import (
     CONF_USERNAME,
 )
 from homeassistant.core import DOMAIN, HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.event import async_track_state_change_event, async_track_time_interval
 from homeassistant.core import (
     Event,
     EventStateChangedData,
     callback,
 )
 
-from .api import API, Hyper2000
+from .api import API, ZendureDevice
 from .const import (
     DEFAULT_SCAN_INTERVAL,
     CONF_CONSUMED,
+    CONF_METER_KEY,
+    CONF_METER_SIGNAL,
+    CONF_METER_TOPIC,
     CONF_PRODUCED,
+    CONF_WORKER,
+    PROPERTY_MAX_AGE,
+    RESYNC_INTERVAL,
+    SIGNAL_PROPERTY_UPDATE,
 )
+from .autotune import StepTest, Tuning, TuningStore
+from .meter import GridMeter
+from .stats import LatencyStats
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -46,10 +60,13 @@ class ZendureCoordinator(DataUpdateCoordinator[int]):
 
         # Set variables from values entered in config flow setup
         self._hass = hass
+        self._entry = config_entry
         self.host = config_entry.data[CONF_HOST]
         self.user = config_entry.data[CONF_USERNAME]
         self.pwd = config_entry.data[CONF_PASSWORD]
         self._outpower = 0
+        self._homepower: dict[str, float] = {}
+        self._unsubs: dict[str, Callable[[], None]] = {}
 
         # set variables from options.  You need a default here incase options have not been set
         self.poll_interval = config_entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
@@ -68,13 +85,32 @@ class ZendureCoordinator(DataUpdateCoordinator[int]):
         self.consumed: str = config_entry.data[CONF_CONSUMED]
         self.produced: str = config_entry.data[CONF_PRODUCED]
 
-        if self.consumed and self.produced:
+        # Direct grid meter input, this replaces the consumed/produced entities
+        self.meter = GridMeter(
+            hass,
+            self.update_power,
+            config_entry.options.get(CONF_METER_TOPIC),
+            config_entry.options.get(CONF_METER_KEY),
+            config_entry.options.get(CONF_METER_SIGNAL),
+        )
+        self.latency = LatencyStats()
+        self.tunings = TuningStore(hass)
+        self._testing: set[str] = set()
+        self._last_command = 0.0
+
+        if self.meter.enabled:
+            _LOGGER.info("Energy input from grid meter")
+        elif self.consumed and self.produced:
             # Set variables from values entered in config flow setup
             _LOGGER.info(f"Energy sensors: {self.consumed} - {self.produced} to _async_update_energy")
-            async_track_state_change_event(self._hass, [self.consumed, self.produced], self._async_update_energy)
+            config_entry.async_on_unload(
+                async_track_state_change_event(self._hass, [self.consumed, self.produced], self._async_update_energy)
+            )
 
         # Initialise your api here
-        self.api = API(self._hass, self.host, self.user, self.pwd)
+        self.api = API(self._hass, self.host, self.user, self.pwd, config_entry.options.get(CONF_WORKER, False))
+        # ingress statistics of the last refresh interval
+        self.ingress_stats = self.api.ingress.as_dict()
 
     async def initialize(self) -> bool:
         _LOGGER.info("Start initialize")
@@ -82,9 +118,21 @@ class ZendureCoordinator(DataUpdateCoordinator[int]):
             if not await self.api.connect():
                 return False
             await self.api.getHypers(self._hass)
+            await self.tunings.async_load()
             self.api.initialize()
             _LOGGER.info(f"Found: {len(self.api.hypers)} hypers")
 
+            for h in self.api.hypers.values():
+                self._track(h)
+            self._entry.async_on_unload(self._untrack_all)
+
+            if self.meter.enabled:
+                self._entry.async_on_unload(await self.meter.async_start())
+
+            self._entry.async_on_unload(
+                async_track_time_interval(self._hass, self._async_resync, timedelta(seconds=RESYNC_INTERVAL))
+            )
+
         except Exception as err:
             _LOGGER.error(err)
         return True
@@ -92,29 +140,127 @@ class ZendureCoordinator(DataUpdateCoordinator[int]):
     async def async_update_data(self):
         _LOGGER.debug("async_update_data")
         self.api.refresh()
+        self.ingress_stats = self.api.ingress.take_stats()
         self._schedule_refresh()
 
+    async def _async_resync(self, _now=None) -> None:
+        """Add and remove the devices which changed in the account."""
+        added, removed = await self.api.resync(self._hass)
+        for h in removed:
+            self._untrack(h)
+            self._homepower.pop(h.hid, None)
+        for h in added:
+            self._track(h)
+        if added or removed:
+            _LOGGER.info(f"Resync: {len(added)} added, {len(removed)} removed")
+
+    def _track(self, h: ZendureDevice) -> None:
+        self._unsubs[h.hid] = async_dispatcher_connect(
+            self._hass,
+            SIGNAL_PROPERTY_UPDATE.format(h.hid, "outputHomePower"),
+            self._homepower_callback(h.hid),
+        )
+
+    def _untrack(self, h: ZendureDevice) -> None:
+        if unsub := self._unsubs.pop(h.hid, None):
+            unsub()
+
+    @callback
+    def _untrack_all(self) -> None:
+        for unsub in self._unsubs.values():
+            unsub()
+        self._unsubs = {}
+
+    def _homepower_callback(self, hid: str):
+        @callback
+        def _update(value, timestamp: float) -> None:
+            self._homepower[hid] = value
+
+        return _update
+
     @callback
     def _async_update_energy(self, event: Event[EventStateChangedData]) -> None:
-        """Publish state change to MQTT."""
+        """Forward a consumed/produced state change to the power controller."""
         try:
             _LOGGER.info("_async_update_energy")
             if (new_state := event.data["new_state"]) is None:
                 return
 
-            h: Hyper2000 = list(self.api.hypers.values())[0]
-            currpower = int(h.sensors["outputHomePower"].state)
-            power = int(float(new_state.state))
-            power = int(float(new_state.state))
-            _LOGGER.info(f"_async_update_energy: {power} - {currpower}")
+            power = float(new_state.state)
+            if event.data["entity_id"] == self.produced:
+                power = -power
+            self.update_power(power, event.time_fired_timestamp)
 
-            if event.data["entity_id"] == self.consumed:
-                currpower += power
-            elif event.data["entity_id"] == self.produced:
-                currpower -= power
+        except Exception as err:
+            _LOGGER.error(err)
+
+    @callback
+    def update_power(self, power: float, timestamp: float | None) -> None:
+        """Adjust the output to the net grid power (positive when consuming), received at timestamp.
+
+        The latency is only recorded when the receive time of the sample is known.
+        """
+        try:
+            if not self.api.hypers:
+                return
+
+            h: ZendureDevice = list(self.api.hypers.values())[0]
+            if h.hid in self._testing:
+                return
+            if h.age("outputHomePower") > PROPERTY_MAX_AGE:
+                _LOGGER.info(f"update_power: outputHomePower of {h.name} is too old")
+                return
+
+            # use the parameters from the step test, if available
+            gain, min_interval = 1.0, 0.0
+            if tuning := self.tunings.tunings.get(h.hid, None):
+                gain, min_interval = tuning.gain, tuning.min_interval
+            if (now := time.time()) - self._last_command < min_interval:
+                return
+
+            currpower = int(self._homepower.get(h.hid, 0))
+            _LOGGER.info(f"update_power: {power} - {currpower}")
 
             # Update the power
-            self.api.update_outpower(h, currpower)
+            self.api.update_outpower(h, int(currpower + gain * power))
+            self._last_command = now
+            if timestamp is not None:
+                self.latency.add(time.time() - timestamp)
 
         except Exception as err:
             _LOGGER.error(err)
+
+    def controlled(self, h: ZendureDevice) -> bool:
+        """Return True when the output of the device is set by the power controller or a step test."""
+        if h.hid in self._testing:
+            return True
+        automatic = self.meter.enabled or bool(self.consumed and self.produced)
+        return automatic and next(iter(self.api.hypers.values()), None) is h
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the latest state of all devices and the controller."""
+        return {
+            "devices": {hid: h.snapshot() for hid, h in self.api.hypers.items()},
+            "controller": {
+                "meter": self.meter.enabled,
+                "testing": list(self._testing),
+                "last_command": self._last_command,
+                "latency": self.latency.as_dict(),
+                "ingress": self.api.ingress.as_dict(),
+                "worker": self.api.worker.as_dict() if self.api.worker is not None else None,
+                "tunings": {hid: asdict(t) for hid, t in self.tunings.tunings.items()},
+            },
+        }
+
+    async def async_step_test(self, h: ZendureDevice, low: int, high: int, steps: int, duration: float) -> dict:
+        """Run a step test on the device and store the recommended parameters."""
+        if h.hid in self._testing:
+            raise HomeAssistantError(f"Step test already running on {h.name}")
+        self._testing.add(h.hid)
+        try:
+            result = await StepTest(self._hass, self.api, h, low, high, steps, duration).async_run()
+        finally:
+            self._testing.discard(h.hid)
+        if "tuning" in result:
+            await self.tunings.async_save(h.hid, Tuning(**result["tuning"]))
+        return result
@@ -0,0 +1,444 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import time
+from asyncio import TimerHandle
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+from paho.mqtt import client as mqtt_client
+from homeassistant.const import EntityCategory, Platform
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.components.number import NumberEntity, NumberMode
+from homeassistant.components.select import SelectEntity
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.switch import SwitchEntity
+
+from .const import (
+    DOMAIN,
+    MESSAGE_HISTORY,
+    SIGNAL_BATTERY_UPDATE,
+    SIGNAL_DEVICE_UPDATE,
+    SIGNAL_FLEET_UPDATE,
+    SIGNAL_PROPERTY_UPDATE,
+    WRITE_BATCH_DELAY,
+)
+from .schema import CATALOG, MODELS, PropertyDef
+
+_LOGGER = logging.getLogger(__name__)
+
+# platform of the writable properties before they could be changed
+LEGACY_PLATFORMS = {
+    Platform.NUMBER: Platform.SENSOR,
+    Platform.SELECT: Platform.SENSOR,
+    Platform.SWITCH: Platform.BINARY_SENSOR,
+}
+
+
+class ZendureDevice:
+    """A Zendure device, with the entities created from the schema of its productKey."""
+
+    addEntities: dict[Platform, AddEntitiesCallback] = {}
+
+    def __init__(self, hass: HomeAssistant, h_id, h_prod, name, device: dict) -> None:
+        """Initialise."""
+        self._hass = hass
+        self.hid = h_id
+        self.prodkey = h_prod
+        self.name = name
+        self.model = MODELS.get(h_prod, "Zendure")
+        self.unique = "".join(name.split())
+        self.catalog: dict[str, PropertyDef] = CATALOG.get(h_prod, {})
+        self.properties: dict[str, Any] = {}
+        self.entities: dict[str, Any] = {}
+        # all entities handed to the platforms, to remove them with the device
+        self.added: list[Entity] = []
+        # properties without an enabled entity, their values are not converted
+        self.ignored: set[str] = set()
+        # report time (device clock) of the accepted property values, and of the latest report
+        self.updated: dict[str, float] = {}
+        self.lastseen = 0.0
+        # local receive time of the property values, and of the latest report
+        self.received: dict[str, float] = {}
+        self.lastreceived = 0.0
+        self._messages: deque = deque(maxlen=MESSAGE_HISTORY)
+        self.batteries: dict[str, Any] = {}
+        # last commanded output power
+        self.outpower: int | None = None
+        self.client: mqtt_client = None
+        self._pending_write: dict[str, Any] = {}
+        self._write_handle: TimerHandle | None = None
+        self._topic_read = f"iot/{self.prodkey}/{self.hid}/properties/read"
+        self._topic_write = f"iot/{self.prodkey}/{self.hid}/properties/write"
+        self.topic_function = f"iot/{self.prodkey}/{self.hid}/function/invoke"
+        self.attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, self.name)},
+            name=self.name,
+            manufacturer="Zendure",
+            model=self.model,
+        )
+
+    def create_entities(self):
+        """Add the entities of the enabled properties in the schema.
+
+        Entities are only instantiated when they are enabled in the entity registry,
+        or when they are not registered yet (diagnostic properties are then registered
+        disabled). Enabling an entity reloads the config entry, which creates it.
+        """
+        _LOGGER.info(f"Adding entities {self.model} {self.name}")
+        self._remove_legacy_entities()
+        entities: dict[Platform, list[Entity]] = {}
+        for prop in self.catalog.values():
+            if (entity := self._create_entity(prop)) is not None:
+                entities.setdefault(prop.platform, []).append(entity)
+
+        # the controller status is not a device property
+        entities.setdefault(Platform.SELECT, []).append(
+            ZendureSelect(self, PropertyDef("status", "Status", Platform.SELECT), ["off", "automatic", "manual"])
+        )
+
+        for platform, items in entities.items():
+            self._add_entities(platform, items)
+
+    def _remove_legacy_entities(self) -> None:
+        """Remove the read only registry entries of the properties which are now writable.
+
+        The unique_id did not change, so without this the old entries stay behind unavailable.
+        """
+        registry = er.async_get(self._hass)
+        for prop in self.catalog.values():
+            if (legacy := LEGACY_PLATFORMS.get(prop.platform, None)) is None:
+                continue
+            if entity_id := registry.async_get_entity_id(legacy, DOMAIN, f"{self.unique}-{prop.key}"):
+                _LOGGER.info(f"Remove legacy entity: {entity_id}")
+                registry.async_remove(entity_id)
+
+    def _add_entities(self, platform: Platform, entities: list[Entity]) -> None:
+        self.added.extend(entities)
+        ZendureDevice.addEntities[platform](entities)
+
+    async def async_remove(self) -> None:
+        """Remove the entities and the device from Home Assistant."""
+        if self._write_handle is not None:
+            self._write_handle.cancel()
+            self._write_handle = None
+        for entity in self.added:
+            if entity.hass is not None:
+                await entity.async_remove(force_remove=True)
+        self.added = []
+        registry = dr.async_get(self._hass)
+        if device := registry.async_get_device(identifiers={(DOMAIN, self.name)}):
+            registry.async_remove_device(device.id)
+
+    def _create_entity(self, prop: PropertyDef) -> ZendureEntity | None:
+        registry = er.async_get(self._hass)
+        entity_id = registry.async_get_entity_id(prop.platform, DOMAIN, f"{self.unique}-{prop.key}")
+        if entity_id is None:
+            enabled = not prop.diagnostic
+        elif (entry := registry.async_get(entity_id)) is not None and entry.disabled:
+            self.ignored.add(prop.key)
+            return None
+        else:
+            enabled = True
+
+        entity = ENTITY_TYPES[prop.platform](self, prop)
+        if enabled:
+            self.entities[prop.key] = entity
+        else:
+            self.ignored.add(prop.key)
+        return entity
+
+    def accept(self, properties: dict[str, Any], timestamp: float | None, message_id: Any = None) -> dict[str, Any]:
+        """Return the values of a report which are newer than the accepted ones.
+
+        Called from the MQTT thread before the report is queued. Duplicate messages
+        are dropped by messageId, and values from a report older than the one which
+        set the current value are dropped by the report timestamp. The report
+        timestamps are only compared with each other, a report without one is
+        accepted in order of arrival.
+        """
+        if message_id is not None:
+            if message_id in self._messages:
+                return {}
+            self._messages.append(message_id)
+
+        if timestamp is None:
+            return properties
+        if timestamp > 1e11:
+            # milliseconds
+            timestamp /= 1000
+
+        updated = self.updated
+        if timestamp < self.lastseen:
+            properties = {k: v for k, v in properties.items() if updated.get(k, 0) <= timestamp}
+        else:
+            self.lastseen = timestamp
+        for key in properties:
+            updated[key] = timestamp
+        return properties
+
+    def expect(self, key: str, check: Callable[[Any], bool]) -> asyncio.Future:
+        """Return a future which is done when a report of the property passes check.
+
+        The subscription starts immediately, cancel the future to stop waiting.
+        """
+        future = self._hass.loop.create_future()
+
+        @callback
+        def _update(value: Any, timestamp: float) -> None:
+            if not future.done() and check(value):
+                future.set_result(True)
+
+        unsub = async_dispatcher_connect(self._hass, SIGNAL_PROPERTY_UPDATE.format(self.hid, key), _update)
+        future.add_done_callback(lambda _: unsub())
+        return future
+
+    def age(self, key: str) -> float:
+        """Return the age in seconds of a property value.
+
+        Reports only contain the changed properties, so a value is as recent as the
+        latest report of the device. The age is measured with the local receive
+        times, the clock of the device may differ.
+        """
+        if key not in self.received:
+            return float("inf")
+        return time.time() - self.lastreceived
+
+    def alive(self, timestamp: float) -> None:
+        """Record a report without changed properties, received at timestamp."""
+        self.lastreceived = max(self.lastreceived, timestamp)
+
+    def write_property(self, key: str, value: Any) -> None:
+        """Queue a property write, sent together with other writes for this device."""
+        self._pending_write[key] = value
+        if self._write_handle is None:
+            self._write_handle = self._hass.loop.call_later(WRITE_BATCH_DELAY, self.flush_write)
+
+    def flush_write(self) -> None:
+        """Send the queued property writes now."""
+        if self._write_handle is not None:
+            self._write_handle.cancel()
+            self._write_handle = None
+        properties, self._pending_write = self._pending_write, {}
+        if not properties or self.client is None:
+            return
+        try:
+            _LOGGER.info(f"Write properties: {self.hid} => {properties}")
+            self.client.publish(self._topic_write, json.dumps({"properties": properties}))
+            # ask for the written values, so the optimistic states are reconciled
+            self.client.publish(self._topic_read, json.dumps({"properties": list(properties)}))
+        except Exception as err:
+            _LOGGER.error(err)
+
+    @callback
+    def update_properties(self, properties: dict[str, Any], timestamp: float) -> None:
+        """Apply a report to the entities and publish the raw values to the dispatcher.
+
+        Subscribers of SIGNAL_PROPERTY_UPDATE receive (value, timestamp) for a single
+        property, subscribers of SIGNAL_DEVICE_UPDATE receive (properties, timestamp)
+        for the whole report. The timestamp is the local receive time of the report.
+        """
+        self.alive(timestamp)
+        for key, value in properties.items():
+            try:
+                self.properties[key] = value
+                self.received[key] = timestamp
+                if entity := self.entities.get(key, None):
+                    entity.update_value(value)
+                elif key in self.ignored:
+                    pass
+                elif isinstance(value, (int, float)):
+                    self.onAddSensor(key, value)
+                else:
+                    _LOGGER.info(f"Found unknown state value:  {self.hid} {key} => {value}")
+                async_dispatcher_send(self._hass, SIGNAL_PROPERTY_UPDATE.format(self.hid, key), value, timestamp)
+            except Exception as err:
+                _LOGGER.error(f"Error value: {self.hid} {err} {key} => {value}")
+        async_dispatcher_send(self._hass, SIGNAL_DEVICE_UPDATE.format(self.hid), properties, timestamp)
+        async_dispatcher_send(self._hass, SIGNAL_FLEET_UPDATE, self.hid, properties, timestamp)
+
+    def onAddSensor(self, propertyName: str, value=None):
+        """Add a diagnostic sensor for a property which is not in the schema."""
+        try:
+            _LOGGER.info(f"{self.hid} new sensor: {propertyName}")
+            prop = PropertyDef(propertyName, propertyName, diagnostic=True)
+            if (sensor := self._create_entity(prop)) is not None:
+                self._add_entities(Platform.SENSOR, [sensor])
+                if value and propertyName in self.entities:
+                    sensor.update_value(value)
+        except Exception as err:
+            _LOGGER.error(err)
+
+    def update_battery(self, data):
+        """Update the battery packs, called from the MQTT thread or the event loop."""
+        _LOGGER.info(f"update_battery: {self.hid} => {data}")
+        self._hass.loop.call_soon_threadsafe(self._update_battery, data, time.time())
+
+    @callback
+    def _update_battery(self, data: Any, timestamp: float) -> None:
+        self.batteries = data
+        async_dispatcher_send(self._hass, SIGNAL_BATTERY_UPDATE, self.hid, data, timestamp)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the latest state of the device.
+
+        The timestamps are the local receive times, as in the SIGNAL_FLEET_UPDATE deltas.
+        """
+        return {
+            "name": self.name,
+            "model": self.model,
+            "productKey": self.prodkey,
+            "timestamp": self.lastreceived,
+            "properties": dict(self.properties),
+            "updated": dict(self.received),
+            "batteries": self.batteries,
+        }
+
+
+class ZendureEntity(Entity):
+    """Base of the entities representing a device property."""
+
+    def __init__(self, device: ZendureDevice, prop: PropertyDef) -> None:
+        """Initialize a Zendure entity."""
+        self._attr_available = True
+        self._attr_device_info = device.attr_device_info
+        self.device = device
+        self.key = prop.key
+        self._attr_name = f"{device.name} {prop.name}"
+        self._attr_unique_id = f"{device.unique}-{prop.key}"
+        self._attr_should_poll = False
+        self._convert = prop.convert
+        if prop.diagnostic:
+            self._attr_entity_category = EntityCategory.DIAGNOSTIC
+            self._attr_entity_registry_enabled_default = False
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop converting values for this entity, for example when it is disabled."""
+        if self.device.entities.get(self.key, None) is self:
+            del self.device.entities[self.key]
+            self.device.ignored.add(self.key)
+
+    def update_value(self, value):
+        try:
+            self._set_value(value)
+            self.schedule_update_ha_state()
+        except Exception as err:
+            _LOGGER.error(f"Error {err} setting state: {self._attr_unique_id} => {value}")
+
+    def _set_value(self, value):
+        """Set the state from a reported value, the platforms convert it to their own state."""
+        self._attr_state = value
+
+
+class ZendureSensor(ZendureEntity, SensorEntity):
+    def __init__(self, device: ZendureDevice, prop: PropertyDef) -> None:
+        """Initialize a Zendure sensor."""
+        super().__init__(device, prop)
+        self._attr_native_unit_of_measurement = prop.unit
+        self._attr_device_class = prop.device_class
+
+    def _set_value(self, value):
+        if self._convert is not None:
+            self._attr_native_value = self._convert(value)
+        elif isinstance(value, (int, float)):
+            self._attr_native_value = int(value)
+
+
+class ZendureBinarySensor(ZendureEntity, BinarySensorEntity):
+    def __init__(self, device: ZendureDevice, prop: PropertyDef) -> None:
+        """Initialize a Zendure binary sensor."""
+        super().__init__(device, prop)
+        self._attr_device_class = prop.device_class
+
+    def _set_value(self, value):
+        self._attr_is_on = self._convert(value) if self._convert is not None else bool(value)
+
+
+class ZendureNumber(ZendureEntity, NumberEntity):
+    """Representation of a writable property, the device value is the displayed value multiplied by factor."""
+
+    def __init__(self, device: ZendureDevice, prop: PropertyDef) -> None:
+        """Initialize a Zendure number."""
+        super().__init__(device, prop)
+        self._attr_native_unit_of_measurement = prop.unit
+        self._attr_device_class = prop.device_class
+        self._attr_native_min_value = prop.minimum
+        self._attr_native_max_value = prop.maximum
+        self._attr_native_step = prop.step
+        self._attr_mode = NumberMode.BOX
+        self._factor = prop.factor
+
+    def _set_value(self, value):
+        if isinstance(value, (int, float)):
+            self._attr_native_value = value / self._factor if self._factor != 1 else int(value)
+
+    async def async_set_native_value(self, value: float) -> None:
+        """Set the value optimistically and write it to the device."""
+        self._attr_native_value = value
+        self.async_write_ha_state()
+        self.device.write_property(self.key, int(round(value * self._factor)))
+
+
+class ZendureSwitch(ZendureEntity, SwitchEntity):
+    """Representation of a writable on/off property."""
+
+    def _set_value(self, value):
+        self._attr_is_on = bool(value)
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Turn the switch on."""
+        self._set(True)
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """Turn the switch off."""
+        self._set(False)
+
+    def _set(self, on: bool) -> None:
+        self._attr_is_on = on
+        self.async_write_ha_state()
+        self.device.write_property(self.key, int(on))
+
+
+class ZendureSelect(ZendureEntity, SelectEntity):
+    """Representation of a select entity.
+
+    When the property has options, the select is backed by the device property,
+    mapping the property values to the option names.
+    """
+
+    def __init__(self, device: ZendureDevice, prop: PropertyDef, options: list[str] | None = None) -> None:
+        """Initialize a Zendure select."""
+        super().__init__(device, prop)
+        self._values = prop.options
+        self._attr_options = list(prop.options.values()) if prop.options else options
+        self._attr_translation_key = prop.key
+        self._attr_current_option = None if prop.options else "off"
+
+    def _set_value(self, value):
+        # unknown values are ignored, the select keeps its current option
+        if (option := self._values.get(int(value), None)) is not None:
+            self._attr_current_option = option
+
+    async def async_select_option(self, option: str) -> None:
+        """Update the current selected option."""
+        self._attr_current_option = option
+        self.async_write_ha_state()
+        if self._values is not None:
+            value = next(v for v, o in self._values.items() if o == option)
+            self.device.write_property(self.key, value)
+
+
+ENTITY_TYPES: dict[Platform, type[ZendureEntity]] = {
+    Platform.BINARY_SENSOR: ZendureBinarySensor,
+    Platform.NUMBER: ZendureNumber,
+    Platform.SELECT: ZendureSelect,
+    Platform.SENSOR: ZendureSensor,
+    Platform.SWITCH: ZendureSwitch,
+}
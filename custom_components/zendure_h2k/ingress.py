@@ -0,0 +1,122 @@
+"""Ingress queue between the MQTT client thread and the event loop."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import INGRESS_MAX_DEPTH, INGRESS_SHED_LAG
+from .device import ZendureDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class IngressQueue:
+    """Hand reports from the MQTT thread to the event loop.
+
+    Reports are merged per device, so only the latest value of each property is
+    kept while the loop is busy and a backlog (for example after a reconnect)
+    collapses into one update per device. A single drain callback is scheduled
+    at a time. When more than INGRESS_MAX_DEPTH values are pending, or the loop
+    lags more than INGRESS_SHED_LAG seconds behind, non-critical values (diagnostic
+    properties and properties which are not in the schema) are dropped.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the queue."""
+        self._hass = hass
+        self._lock = threading.Lock()
+        self._pending: dict[str, tuple[ZendureDevice, dict[str, Any], float]] = {}
+        self._scheduled_at: float | None = None
+        self.depth = 0
+        self.peak_depth = 0
+        self.lag = 0.0
+        self.received = 0
+        self.collapsed = 0
+        self.dropped = 0
+        self.shed = 0
+        self.stale = 0
+
+    @staticmethod
+    def critical(device: ZendureDevice, key: str) -> bool:
+        return (prop := device.catalog.get(key, None)) is not None and not prop.diagnostic
+
+    def put(
+        self,
+        device: ZendureDevice,
+        properties: dict[str, Any],
+        timestamp: float,
+        reported: float | None = None,
+        message_id: Any = None,
+    ) -> None:
+        """Queue a report, called from the MQTT thread.
+
+        The report is first checked by the device for duplicates and out of order
+        values, using its report time and messageId.
+        """
+        with self._lock:
+            self.received += len(properties)
+            if len(accepted := device.accept(properties, reported, message_id)) < len(properties):
+                self.stale += len(properties) - len(accepted)
+                if not (properties := accepted):
+                    return
+            if (batch := self._pending.get(device.hid, None)) is None:
+                values: dict[str, Any] = {}
+            else:
+                values = batch[1]
+            full = self.depth >= INGRESS_MAX_DEPTH
+            for key, value in properties.items():
+                if key in values:
+                    self.collapsed += 1
+                elif full and not self.critical(device, key):
+                    self.dropped += 1
+                    continue
+                else:
+                    self.depth += 1
+                values[key] = value
+            self._pending[device.hid] = (device, values, timestamp)
+            self.peak_depth = max(self.peak_depth, self.depth)
+
+            if self._scheduled_at is None:
+                self._scheduled_at = time.monotonic()
+                self._hass.loop.call_soon_threadsafe(self._drain)
+
+    @callback
+    def _drain(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self.lag = time.monotonic() - self._scheduled_at
+            self._scheduled_at = None
+            self.depth = 0
+
+        shedding = self.lag > INGRESS_SHED_LAG
+        for device, values, timestamp in pending.values():
+            if shedding:
+                count = len(values)
+                values = {k: v for k, v in values.items() if self.critical(device, k)}
+                self.shed += count - len(values)
+            if values:
+                device.update_properties(values, timestamp)
+
+    def take_stats(self) -> dict[str, Any]:
+        """Return the statistics and start a new peak depth period."""
+        with self._lock:
+            stats = self.as_dict()
+            self.peak_depth = self.depth
+        return stats
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "peak_depth": self.peak_depth,
+            "lag": round(self.lag * 1000, 1),
+            "received": self.received,
+            "collapsed": self.collapsed,
+            "dropped": self.dropped,
+            "shed": self.shed,
+            "stale": self.stale,
+        }
@@ -0,0 +1,92 @@
+"""Direct grid meter input for the Zendure power controller."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import json
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GridMeter:
+    """Deliver net grid power samples straight into the control path.
+
+    Samples are read from a raw MQTT topic (for example a local P1/DSMR bridge)
+    and/or a dispatcher signal, and passed to on_sample as (power, timestamp) with
+    the power in W, positive when consuming from the grid. The timestamp is the
+    time (time.time()) the sample was received by the MQTT client or sent by the
+    signal sender, None when it is not known.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        on_sample: Callable[[float, float | None], None],
+        topic: str | None = None,
+        key: str | None = None,
+        signal: str | None = None,
+    ) -> None:
+        """Initialize the meter."""
+        self._hass = hass
+        self._on_sample = on_sample
+        self.topic = topic
+        self.signal = signal
+        self._path = key.split(".") if key else []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.topic or self.signal)
+
+    async def async_start(self) -> Callable[[], None]:
+        """Subscribe to the configured sources, return the unsubscribe callback."""
+        unsubs: list[Callable[[], None]] = []
+        if self.topic:
+            # mqtt is only needed when a meter topic is configured
+            from homeassistant.components import mqtt
+
+            if await mqtt.async_wait_for_mqtt_client(self._hass):
+                _LOGGER.info(f"Grid meter topic: {self.topic}")
+                unsubs.append(await mqtt.async_subscribe(self._hass, self.topic, self._on_message))
+            else:
+                _LOGGER.error(f"MQTT is not available, unable to subscribe to {self.topic}")
+        if self.signal:
+            _LOGGER.info(f"Grid meter signal: {self.signal}")
+            unsubs.append(async_dispatcher_connect(self._hass, self.signal, self._on_signal))
+
+        @callback
+        def _unsubscribe() -> None:
+            for unsub in unsubs:
+                unsub()
+
+        return _unsubscribe
+
+    @callback
+    def _on_message(self, msg: Any) -> None:
+        # the message is stamped (time.monotonic()) by the MQTT client thread, so the
+        # latency includes the handoff to the event loop
+        if (received := getattr(msg, "timestamp", None)) is not None:
+            timestamp = time.time() - (time.monotonic() - received)
+        else:
+            timestamp = None
+        try:
+            payload = msg.payload
+            try:
+                power = float(payload)
+            except ValueError:
+                value = json.loads(payload)
+                for part in self._path:
+                    value = value[part]
+                power = float(value)
+            self._on_sample(power, timestamp)
+        except Exception as err:
+            _LOGGER.error(f"Invalid grid meter value: {msg.topic} {err} => {msg.payload}")
+
+    @callback
+    def _on_signal(self, power: float, timestamp: float | None = None) -> None:
+        self._on_sample(float(power), timestamp)
@@ -0,0 +1,13 @@
+"""Interfaces with the Zendure Integration api numbers."""
+from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from .device import ZendureDevice
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+):
+    ZendureDevice.addEntities[Platform.NUMBER] = async_add_entities
@@ -0,0 +1,132 @@
+"""Property schema of the supported Zendure products.
+
+Each product is described by the properties it reports. The definitions are
+collected once at import into CATALOG, a lookup of productKey => property key =>
+PropertyDef, so adding a model only requires adding its property list here.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.const import Platform
+
+
+@dataclass(frozen=True, slots=True)
+class PropertyDef:
+    """Definition of a single device property and the entity representing it.
+
+    Sensors and binary sensors are read only. Numbers, switches and selects are
+    writable; a number writes the displayed value multiplied by factor, a select
+    writes the key of the chosen option. Diagnostic properties are rarely used,
+    their entities are registered disabled.
+    """
+
+    key: str
+    name: str
+    platform: Platform = Platform.SENSOR
+    unit: str | None = None
+    device_class: str | None = None
+    convert: Callable[[Any], Any] | None = None
+    factor: int = 1
+    minimum: float = 0
+    maximum: float = 100
+    step: float = 1
+    options: dict[int, str] | None = None
+    diagnostic: bool = False
+
+    @property
+    def writable(self) -> bool:
+        return self.platform in (Platform.NUMBER, Platform.SELECT, Platform.SWITCH)
+
+
+def decikelvin(value: Any) -> float:
+    return round(value / 10 - 273.15, 2)
+
+
+def mapping(values: dict[int, str]) -> Callable[[Any], str]:
+    def convert(value: Any) -> str:
+        return values.get(int(value), "???")
+
+    return convert
+
+
+def sensor(key: str, name: str, unit: str | None = None, device_class: str | None = None, **kwargs: Any) -> PropertyDef:
+    return PropertyDef(key, name, Platform.SENSOR, unit, device_class, **kwargs)
+
+
+def binary(key: str, name: str, device_class: str | None = None, **kwargs: Any) -> PropertyDef:
+    return PropertyDef(key, name, Platform.BINARY_SENSOR, None, device_class, convert=bool, **kwargs)
+
+
+def number(key: str, name: str, unit: str | None, device_class: str | None, minimum: float, maximum: float, step: float = 1, factor: int = 1) -> PropertyDef:
+    return PropertyDef(key, name, Platform.NUMBER, unit, device_class, factor=factor, minimum=minimum, maximum=maximum, step=step)
+
+
+def switch(key: str, name: str) -> PropertyDef:
+    return PropertyDef(key, name, Platform.SWITCH)
+
+
+def select(key: str, name: str, options: dict[int, str]) -> PropertyDef:
+    return PropertyDef(key, name, Platform.SELECT, options=options)
+
+
+COMMON = (
+    switch("masterSwitch", "Master Switch"),
+    switch("buzzerSwitch", "Buzzer Switch"),
+    binary("wifiState", "WiFi State", "connectivity", diagnostic=True),
+    number("socSet", "socSet", "%", None, 70, 100, factor=10),
+    number("minSoc", "minSOC", "%", None, 0, 50, factor=10),
+    sensor("hubState", "Hub State", diagnostic=True),
+    sensor("solarInputPower", "Solar Input Power", "W", "power"),
+    sensor("packInputPower", "Pack Input Power", "W", "power"),
+    sensor("outputPackPower", "Output Pack Power", "W", "power"),
+    sensor("outputHomePower", "Output Home Power", "W", "power"),
+    sensor("remainOutTime", "Remain Out Time", "min", "duration"),
+    sensor("remainInputTime", "Remain Input Time", "min", "duration"),
+    sensor("packState", "Pack State"),
+    sensor("packNum", "Pack Num"),
+    sensor("electricLevel", "Electric Level", "%", "battery"),
+    sensor("solarPower1", "Solar Power 1", "W", "power"),
+    sensor("solarPower2", "Solar Power 2", "W", "power"),
+    sensor("pass", "Pass Mode", diagnostic=True),
+    sensor("strength", "WiFi strength", diagnostic=True),
+)
+
+HYPER2000 = (
+    *COMMON,
+    binary("heatState", "Heat State"),
+    select("acMode", "AC Mode", {1: "input", 2: "output"}),
+    number("inputLimit", "Input Limit", "W", "power", 0, 1200, 100),
+    number("outputLimit", "Output Limit", "W", "power", 0, 800),
+    sensor("chargingMode", "Charging Mode", convert=mapping({0: "None", 1: "Standby", 2: "Charging"})),
+    sensor("inverseMaxPower", "Inverse Max Power", "W", diagnostic=True),
+    sensor("hyperTmp", "Hyper Temperature", "°C", "temperature", convert=decikelvin),
+)
+
+HUB = (
+    *COMMON,
+    number("outputLimit", "Output Limit", "W", "power", 0, 1200),
+    sensor("inverseMaxPower", "Inverse Max Power", "W", diagnostic=True),
+)
+
+AIO = (
+    *COMMON,
+    number("outputLimit", "Output Limit", "W", "power", 0, 1200),
+)
+
+# productKey => (model name, properties)
+PRODUCTS: dict[str, tuple[str, tuple[PropertyDef, ...]]] = {
+    "ja72U0ha": ("Hyper 2000", HYPER2000),
+    "73bkTV": ("SolarFlow Hub 1200", HUB),
+    "A8yh63": ("SolarFlow Hub 2000", HUB),
+    "yWF7hV": ("SolarFlow AIO 2400", AIO),
+}
+
+CATALOG: dict[str, dict[str, PropertyDef]] = {
+    productkey: {prop.key: prop for prop in properties} for productkey, (_, properties) in PRODUCTS.items()
+}
+
+MODELS: dict[str, str] = {productkey: model for productkey, (model, _) in PRODUCTS.items()}
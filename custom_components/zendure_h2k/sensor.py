@@ -1,12 +1,93 @@
 """Interfaces with the Zendure Integration api sensors."""
+from collections.abc import Callable
+from typing import Any
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.const import EntityCategory, Platform
+from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from .hyper2000 import Hyper2000
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .const import DOMAIN
+from .coordinator import ZendureCoordinator
+from .device import ZendureDevice
 
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ):
-    Hyper2000.addSensors = async_add_entities
+    ZendureDevice.addEntities[Platform.SENSOR] = async_add_entities
+    coordinator: ZendureCoordinator = config_entry.runtime_data.coordinator
+    async_add_entities(
+        [
+            ControllerSensor(coordinator, config_entry, "latency", "Controller latency", latency, "last", "ms"),
+            ControllerSensor(coordinator, config_entry, "ingress_peak_depth", "Ingress queue peak depth", ingress, "peak_depth"),
+            ControllerSensor(coordinator, config_entry, "ingress_dropped", "Ingress dropped values", ingress, "dropped"),
+            ControllerSensor(coordinator, config_entry, "ingress_shed", "Ingress shed values", ingress, "shed"),
+            ControllerSensor(coordinator, config_entry, "ingress_stale", "Ingress stale values", ingress, "stale"),
+            ControllerSensor(coordinator, config_entry, "loop_lag", "Event loop lag", ingress, "lag", "ms"),
+        ]
+    )
+    if coordinator.api.use_worker:
+        async_add_entities(
+            [
+                ControllerSensor(coordinator, config_entry, "worker_restarts", "Worker restarts", worker, "restarts"),
+                ControllerSensor(coordinator, config_entry, "worker_cpu", "Worker CPU time", worker, "cpu", "s"),
+            ]
+        )
+
+
+def latency(coordinator: ZendureCoordinator) -> dict[str, Any]:
+    return coordinator.latency.as_dict()
+
+
+def ingress(coordinator: ZendureCoordinator) -> dict[str, Any]:
+    return coordinator.ingress_stats
+
+
+def worker(coordinator: ZendureCoordinator) -> dict[str, Any]:
+    if coordinator.api.worker is None:
+        return {"running": False, "restarts": None, "cpu": None}
+    return coordinator.api.worker.as_dict()
+
+
+class ControllerSensor(CoordinatorEntity[ZendureCoordinator], SensorEntity):
+    """Diagnostic value of the controller or the message pipeline.
+
+    The value is refreshed with the coordinator, so it adds nothing to the
+    control path or the report pipeline.
+    """
+
+    def __init__(
+        self,
+        coordinator: ZendureCoordinator,
+        config_entry: ConfigEntry,
+        uniqueid: str,
+        name: str,
+        stats: Callable[[ZendureCoordinator], dict[str, Any]],
+        value: str,
+        uom: str = None,
+    ) -> None:
+        """Initialize the controller sensor, its state is stats()[value]."""
+        super().__init__(coordinator)
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, config_entry.entry_id)},
+            name="Zendure Controller",
+            manufacturer="Zendure",
+            model="Power controller",
+        )
+        self._attr_name = name
+        self._attr_unique_id = f"{config_entry.entry_id}-{uniqueid}"
+        self._attr_native_unit_of_measurement = uom
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._stats = stats
+        self._value = value
+
+    @property
+    def native_value(self) -> float | None:
+        return self._stats(self.coordinator)[self._value]
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return self._stats(self.coordinator)
@@ -0,0 +1,288 @@
+"""Services for the Zendure Integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+
+from .const import DOMAIN
+from .coordinator import ZendureCoordinator
+from .device import ZendureDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_SET_LIMITS = "set_limits"
+SERVICE_SET_MODE = "set_mode"
+SERVICE_SET_OUTPUT_POWER = "set_output_power"
+SERVICE_SNAPSHOT = "snapshot"
+SERVICE_STEP_TEST = "step_test"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_DEVICE_ID = "device_id"
+ATTR_POWER = "power"
+ATTR_INPUT_LIMIT = "input_limit"
+ATTR_OUTPUT_LIMIT = "output_limit"
+ATTR_SOC_SET = "soc_set"
+ATTR_MIN_SOC = "min_soc"
+ATTR_MODE = "mode"
+ATTR_TIMEOUT = "timeout"
+ATTR_LOW = "low"
+ATTR_HIGH = "high"
+ATTR_STEPS = "steps"
+ATTR_DURATION = "duration"
+
+STEP_TEST_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_LOW, default=100): vol.All(vol.Coerce(int), vol.Range(min=0, max=800)),
+        vol.Optional(ATTR_HIGH, default=400): vol.All(vol.Coerce(int), vol.Range(min=0, max=800)),
+        vol.Optional(ATTR_STEPS, default=4): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
+        vol.Optional(ATTR_DURATION, default=30): vol.All(vol.Coerce(float), vol.Range(min=5, max=300)),
+    }
+)
+
+TARGET_SCHEMA = {
+    vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Optional(ATTR_TIMEOUT, default=10): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+}
+
+SET_OUTPUT_POWER_SCHEMA = vol.Schema(
+    {
+        **TARGET_SCHEMA,
+        vol.Required(ATTR_POWER): vol.All(vol.Coerce(int), vol.Range(min=0, max=800)),
+    }
+)
+
+SET_LIMITS_SCHEMA = vol.Schema(
+    {
+        **TARGET_SCHEMA,
+        vol.Optional(ATTR_INPUT_LIMIT): vol.Coerce(float),
+        vol.Optional(ATTR_OUTPUT_LIMIT): vol.Coerce(float),
+        vol.Optional(ATTR_SOC_SET): vol.Coerce(float),
+        vol.Optional(ATTR_MIN_SOC): vol.Coerce(float),
+    }
+)
+
+SET_MODE_SCHEMA = vol.Schema(
+    {
+        **TARGET_SCHEMA,
+        vol.Required(ATTR_MODE): cv.string,
+    }
+)
+
+# service attribute => device property
+LIMITS = {
+    ATTR_INPUT_LIMIT: "inputLimit",
+    ATTR_OUTPUT_LIMIT: "outputLimit",
+    ATTR_SOC_SET: "socSet",
+    ATTR_MIN_SOC: "minSoc",
+}
+
+# allowed difference (W) between the requested and the reported output power
+POWER_TOLERANCE = 10
+
+# A command plan maps the properties to confirm to their check, and sends the command
+Plan = tuple[dict[str, Callable[[Any], bool]], Callable[[], None]]
+
+
+def coordinators(hass: HomeAssistant) -> list[ZendureCoordinator]:
+    """Return the coordinators of the loaded config entries."""
+    return [
+        entry.runtime_data.coordinator
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED
+    ]
+
+
+def find_hyper(hass: HomeAssistant, device_id: str) -> tuple[ZendureCoordinator, ZendureDevice]:
+    """Return the coordinator and device for a device registry id."""
+    if (device := dr.async_get(hass).async_get(device_id)) is None:
+        raise ServiceValidationError(f"Unknown device: {device_id}")
+    names = {identifier for domain, identifier in device.identifiers if domain == DOMAIN}
+    for coordinator in coordinators(hass):
+        for h in coordinator.api.hypers.values():
+            if h.name in names:
+                return coordinator, h
+    raise ServiceValidationError(f"Not a Zendure device: {device.name}")
+
+
+def find_hypers(hass: HomeAssistant, data: dict[str, Any]) -> list[tuple[ZendureCoordinator, ZendureDevice]]:
+    """Return the devices of the config entry and the device ids of a service call."""
+    targets: dict[str, tuple[ZendureCoordinator, ZendureDevice]] = {}
+    if entry_id := data.get(ATTR_CONFIG_ENTRY_ID, None):
+        entry = hass.config_entries.async_get_entry(entry_id)
+        if entry is None or entry.domain != DOMAIN or entry.state is not ConfigEntryState.LOADED:
+            raise ServiceValidationError(f"Not a loaded Zendure config entry: {entry_id}")
+        coordinator = entry.runtime_data.coordinator
+        for h in coordinator.api.hypers.values():
+            targets[h.hid] = (coordinator, h)
+    for device_id in data.get(ATTR_DEVICE_ID, []):
+        coordinator, h = find_hyper(hass, device_id)
+        targets[h.hid] = (coordinator, h)
+    if not targets:
+        raise ServiceValidationError("No Zendure devices to control")
+    return list(targets.values())
+
+
+def write_plan(h: ZendureDevice, values: dict[str, Any]) -> Plan | str:
+    """Return the plan to write the raw property values which differ from the reported ones."""
+    for key in values:
+        if (prop := h.catalog.get(key, None)) is None or not prop.writable:
+            return "unsupported"
+    changes = {key: raw for key, raw in values.items() if h.properties.get(key, None) != raw}
+
+    def send() -> None:
+        for key, raw in changes.items():
+            h.write_property(key, raw)
+        h.flush_write()
+
+    return {key: (lambda v, raw=raw: v == raw) for key, raw in changes.items()}, send
+
+
+async def async_command(
+    targets: list[tuple[ZendureCoordinator, ZendureDevice]],
+    plan: Callable[[ZendureCoordinator, ZendureDevice], Plan | str],
+    timeout: float,
+) -> ServiceResponse:
+    """Send a command to all devices at once and wait for the confirming reports.
+
+    Devices which already have the requested values are skipped. The result per
+    device is skipped, unsupported, busy (controlled by the power controller or a
+    step test), sent (when timeout is 0), confirmed or timeout, with the latency in
+    ms from sending to the last confirming report. Confirmed means the reported
+    values reached the target; for the output power this is outputHomePower, so a
+    device limited by its soc, outputLimit or solar power ends with timeout.
+    """
+
+    async def run(coordinator: ZendureCoordinator, h: ZendureDevice) -> dict[str, Any]:
+        result: dict[str, Any] = {"device": h.name}
+        if isinstance(p := plan(coordinator, h), str):
+            return result | {"status": p}
+        checks, send = p
+        if not checks:
+            return result | {"status": "skipped"}
+
+        # subscribe before sending, so a fast report is not missed
+        expected = [h.expect(key, check) for key, check in checks.items()]
+        start = time.monotonic()
+        send()
+        if timeout == 0:
+            for future in expected:
+                future.cancel()
+            return result | {"status": "sent", "latency": round((time.monotonic() - start) * 1000, 1)}
+        _, pending = await asyncio.wait(expected, timeout=timeout)
+        for future in pending:
+            future.cancel()
+        return result | {
+            "status": "timeout" if pending else "confirmed",
+            "latency": None if pending else round((time.monotonic() - start) * 1000, 1),
+        }
+
+    results = await asyncio.gather(*(run(coordinator, h) for coordinator, h in targets))
+    return {"results": {h.hid: result for (_, h), result in zip(targets, results, strict=True)}}
+
+
+def fleet_snapshot(hass: HomeAssistant) -> dict[str, Any]:
+    """Return the latest state of the devices and controllers of all config entries."""
+    return {
+        entry.entry_id: entry.runtime_data.coordinator.snapshot()
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED
+    }
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services, once for all config entries."""
+    if hass.services.has_service(DOMAIN, SERVICE_STEP_TEST):
+        return
+
+    async def step_test(call: ServiceCall) -> ServiceResponse:
+        if call.data[ATTR_HIGH] <= call.data[ATTR_LOW]:
+            raise ServiceValidationError("The high power of a step test must be above the low power")
+        coordinator, h = find_hyper(hass, call.data[ATTR_DEVICE_ID])
+        return await coordinator.async_step_test(
+            h,
+            call.data[ATTR_LOW],
+            call.data[ATTR_HIGH],
+            call.data[ATTR_STEPS],
+            call.data[ATTR_DURATION],
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STEP_TEST,
+        step_test,
+        schema=STEP_TEST_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def set_output_power(call: ServiceCall) -> ServiceResponse:
+        power = call.data[ATTR_POWER]
+
+        def plan(coordinator: ZendureCoordinator, h: ZendureDevice) -> Plan | str:
+            if coordinator.controlled(h):
+                return "busy"
+            # the output may be limited by the soc, outputLimit or solar power, so the
+            # skip compares with the last command and not with the measured output
+            if h.outpower == power:
+                return {}, lambda: None
+            return (
+                {"outputHomePower": lambda v: abs(v - power) <= POWER_TOLERANCE},
+                lambda: coordinator.api.update_outpower(h, power),
+            )
+
+        return await async_command(find_hypers(hass, call.data), plan, call.data[ATTR_TIMEOUT])
+
+    async def set_limits(call: ServiceCall) -> ServiceResponse:
+        limits = {key: call.data[attr] for attr, key in LIMITS.items() if attr in call.data}
+        if not limits:
+            raise ServiceValidationError("No limits to set")
+
+        def plan(coordinator: ZendureCoordinator, h: ZendureDevice) -> Plan | str:
+            # the ranges differ per model, a value outside the range of the device is not sent
+            if any(
+                (prop := h.catalog.get(key, None)) is None or not prop.minimum <= value <= prop.maximum
+                for key, value in limits.items()
+            ):
+                return "unsupported"
+            return write_plan(h, {key: int(round(value * h.catalog[key].factor)) for key, value in limits.items()})
+
+        return await async_command(find_hypers(hass, call.data), plan, call.data[ATTR_TIMEOUT])
+
+    async def set_mode(call: ServiceCall) -> ServiceResponse:
+        mode = call.data[ATTR_MODE]
+
+        def plan(coordinator: ZendureCoordinator, h: ZendureDevice) -> Plan | str:
+            if (prop := h.catalog.get("acMode", None)) is None or mode not in prop.options.values():
+                return "unsupported"
+            return write_plan(h, {"acMode": next(v for v, o in prop.options.items() if o == mode)})
+
+        return await async_command(find_hypers(hass, call.data), plan, call.data[ATTR_TIMEOUT])
+
+    for name, handler, schema in (
+        (SERVICE_SET_OUTPUT_POWER, set_output_power, SET_OUTPUT_POWER_SCHEMA),
+        (SERVICE_SET_LIMITS, set_limits, SET_LIMITS_SCHEMA),
+        (SERVICE_SET_MODE, set_mode, SET_MODE_SCHEMA),
+    ):
+        hass.services.async_register(DOMAIN, name, handler, schema=schema, supports_response=SupportsResponse.OPTIONAL)
+
+    async def snapshot(call: ServiceCall) -> ServiceResponse:
+        return {"entries": fleet_snapshot(hass)}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SNAPSHOT,
+        snapshot,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,42 @@
+"""Latency statistics for the Zendure Integration."""
+
+from __future__ import annotations
+
+from collections import deque
+
+
+class LatencyStats:
+    """Keep the most recent latency samples (in seconds) and summarize them."""
+
+    def __init__(self, size: int = 100) -> None:
+        """Initialize the statistics."""
+        self._samples: deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, latency: float) -> None:
+        self._samples.append(latency)
+        self.count += 1
+
+    @property
+    def last(self) -> float | None:
+        return self._samples[-1] if self._samples else None
+
+    def percentile(self, pct: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def as_dict(self) -> dict[str, float | int | None]:
+        """Return the summary in milliseconds."""
+
+        def ms(value: float | None) -> float | None:
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            "last": ms(self.last),
+            "p50": ms(self.percentile(50)),
+            "p95": ms(self.percentile(95)),
+            "max": ms(max(self._samples, default=None)),
+            "count": self.count,
+        }
@@ -0,0 +1,76 @@
+"""Websocket commands for the Zendure Integration."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN, SIGNAL_BATTERY_UPDATE, SIGNAL_FLEET_UPDATE
+from .services import fleet_snapshot
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, ws_snapshot)
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+def entry_id(hass: HomeAssistant, hid: str) -> str | None:
+    """Return the id of the config entry of a device, the snapshot is keyed by it."""
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.state is ConfigEntryState.LOADED and hid in entry.runtime_data.coordinator.api.hypers:
+            return entry.entry_id
+    return None
+
+
+@websocket_api.websocket_command({vol.Required("type"): "zendure_h2k/snapshot"})
+@callback
+def ws_snapshot(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]) -> None:
+    """Return the latest state of all devices and controllers."""
+    connection.send_result(msg["id"], {"entries": fleet_snapshot(hass)})
+
+
+@websocket_api.websocket_command({vol.Required("type"): "zendure_h2k/subscribe"})
+@callback
+def ws_subscribe(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]) -> None:
+    """Send the snapshot, followed by the changed properties of every report.
+
+    The snapshot event has an entries key, the delta events have the entry_id,
+    device and timestamp keys, with properties for a report or batteries for a
+    battery pack update. All timestamps are the local receive times, so the
+    deltas can be matched with the snapshot.
+    """
+
+    def forwarder(key: str) -> Callable[[str, Any, float], None]:
+        @callback
+        def forward(hid: str, data: Any, timestamp: float) -> None:
+            connection.send_message(
+                websocket_api.event_message(
+                    msg["id"],
+                    {"entry_id": entry_id(hass, hid), "device": hid, key: data, "timestamp": timestamp},
+                )
+            )
+
+        return forward
+
+    unsubs = [
+        async_dispatcher_connect(hass, SIGNAL_FLEET_UPDATE, forwarder("properties")),
+        async_dispatcher_connect(hass, SIGNAL_BATTERY_UPDATE, forwarder("batteries")),
+    ]
+
+    @callback
+    def unsubscribe() -> None:
+        for unsub in unsubs:
+            unsub()
+
+    connection.subscriptions[msg["id"]] = unsubscribe
+    connection.send_result(msg["id"])
+    connection.send_message(websocket_api.event_message(msg["id"], {"entries": fleet_snapshot(hass)}))
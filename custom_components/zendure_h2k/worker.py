@@ -0,0 +1,289 @@
+"""Subprocess ingestion worker for the Zendure Integration.
+
+For large fleets the MQTT client and the JSON decoding can run in a separate
+process, so they do not compete with Home Assistant for the GIL. The worker is
+this file started as a script; it only depends on the standard library and
+paho-mqtt, so the process does not import Home Assistant.
+
+The processes talk with JSON lines over the stdin/stdout pipes:
+- to the worker: {"connect": {...}}, {"subscribe": topic}, {"unsubscribe": topic}
+  and {"publish": [topic, payload]}
+- from the worker: {"reports": {deviceKey: [timestamp, {key: value}]}} with only
+  the changed values since the previous batch and the newest report timestamp
+  of the batch, {"battery": {deviceKey: params}}
+  with the battery pack logs, and {"cpu": seconds} heartbeats.
+
+Properties which are read explicitly (properties/read, for example after a write)
+are forwarded with the next report even when unchanged, so the main process can
+reconcile its optimistic states. Duplicate reports (by messageId) and values from
+reports older than the one which set the current value are dropped by the worker.
+
+The worker stops when its stdin is closed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 0.2
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+RESTART_DELAY = 5.0
+MESSAGE_HISTORY = 32
+
+
+class Decoder:
+    """Decode report messages into per device delta batches."""
+
+    def __init__(self) -> None:
+        """Initialize the decoder."""
+        self._lock = threading.Lock()
+        self._pending: dict[str, list] = {}
+        self._batteries: dict[str, Any] = {}
+        self._last: dict[str, dict[str, Any]] = {}
+        # report time of the last values, to drop values of older reports
+        self._updated: dict[str, dict[str, float]] = {}
+        self._messages: dict[str, deque] = {}
+        # properties to forward even when unchanged, None for all properties
+        self._reads: dict[str, set[str] | None] = {}
+
+    def read(self, topic: str, payload: str) -> None:
+        """Record the properties requested with a properties/read message."""
+        deviceid = topic.split("/")[-3]
+        properties = json.loads(payload).get("properties", [])
+        with self._lock:
+            if "getAll" in properties or deviceid in self._reads and self._reads[deviceid] is None:
+                self._reads[deviceid] = None
+            else:
+                self._reads.setdefault(deviceid, set()).update(properties)
+
+    def decode(self, topic: str, payload: bytes) -> None:
+        parameter = topic.split("/")[-1]
+        if parameter not in ("report", "log"):
+            return
+        data = json.loads(payload)
+        if (deviceid := data.get("deviceId", None)) is None:
+            return
+        if parameter == "log":
+            if data.get("logType", None) == 2:
+                with self._lock:
+                    self._batteries[deviceid] = data["log"]["params"]
+            return
+        if (message_id := data.get("messageId", None)) is not None:
+            messages = self._messages.setdefault(deviceid, deque(maxlen=MESSAGE_HISTORY))
+            if message_id in messages:
+                return
+            messages.append(message_id)
+
+        timestamp = data.get("timestamp", None)
+        last = self._last.setdefault(deviceid, {})
+        updated = self._updated.setdefault(deviceid, {})
+        with self._lock:
+            # the batch is shipped even without changes, to keep the values fresh
+            batch = self._pending.setdefault(deviceid, [timestamp, {}])
+            if timestamp is not None and (batch[0] is None or timestamp > batch[0]):
+                batch[0] = timestamp
+            properties = data.get("properties", {})
+            reads = self._reads.pop(deviceid, set()) if properties else set()
+            for key, value in properties.items():
+                if timestamp is not None:
+                    if updated.get(key, 0) > timestamp:
+                        continue
+                    updated[key] = timestamp
+                if reads is None or key in reads or last.get(key, None) != value:
+                    last[key] = value
+                    batch[1][key] = value
+            if reads:
+                # the other properties are still expected in a later report
+                self._reads[deviceid] = reads - properties.keys()
+
+    def take(self) -> tuple[dict[str, list], dict[str, Any]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            batteries, self._batteries = self._batteries, {}
+        return pending, batteries
+
+
+def run() -> None:
+    """Run the worker process."""
+    from paho.mqtt import client as mqtt_client
+
+    decoder = Decoder()
+    client: mqtt_client.Client | None = None
+    stopped = threading.Event()
+    out = sys.stdout
+
+    def on_message(_client, userdata, msg) -> None:
+        try:
+            decoder.decode(msg.topic, msg.payload)
+        except Exception as err:
+            _LOGGER.error(f"Error decoding {msg.topic}: {err}")
+
+    def commands() -> None:
+        nonlocal client
+        for line in sys.stdin:
+            try:
+                cmd = json.loads(line)
+                if connect := cmd.get("connect", None):
+                    client = mqtt_client.Client(client_id=connect["client_id"], clean_session=False)
+                    client.username_pw_set(username=connect["username"], password=connect["password"])
+                    client.on_message = on_message
+                    client.connect(connect["host"], connect.get("port", 1883), 120)
+                    client.loop_start()
+                elif client is None:
+                    continue
+                elif topic := cmd.get("subscribe", None):
+                    client.subscribe(topic)
+                elif topic := cmd.get("unsubscribe", None):
+                    client.unsubscribe(topic)
+                elif publish := cmd.get("publish", None):
+                    if publish[0].endswith("/properties/read"):
+                        decoder.read(publish[0], publish[1])
+                    client.publish(publish[0], publish[1])
+            except Exception as err:
+                _LOGGER.error(f"Error command {line}: {err}")
+        stopped.set()
+
+    threading.Thread(target=commands, daemon=True).start()
+
+    heartbeat = 0.0
+    while not stopped.wait(FLUSH_INTERVAL):
+        batches, batteries = decoder.take()
+        if batches:
+            out.write(json.dumps({"reports": batches}, separators=(",", ":")) + "\n")
+        if batteries:
+            out.write(json.dumps({"battery": batteries}, separators=(",", ":")) + "\n")
+        if (now := time.monotonic()) - heartbeat >= HEARTBEAT_INTERVAL:
+            heartbeat = now
+            times = os.times()
+            out.write(json.dumps({"cpu": times.user + times.system}) + "\n")
+        out.flush()
+
+    if client is not None:
+        client.loop_stop()
+        client.disconnect()
+
+
+class WorkerClient:
+    """Main process side of the worker, with the publish/subscribe interface of the mqtt client.
+
+    The worker is restarted when it exits or its heartbeat stops, and the
+    subscriptions are restored.
+    """
+
+    def __init__(
+        self,
+        connect: dict[str, Any],
+        on_reports: Callable[[dict[str, list]], None],
+        on_battery: Callable[[dict[str, Any]], None],
+    ) -> None:
+        """Initialize the worker client."""
+        self._connect = connect
+        self._on_reports = on_reports
+        self._on_battery = on_battery
+        self._subscriptions: set[str] = set()
+        self._proc: asyncio.subprocess.Process | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._lastseen = 0.0
+        self.restarts = 0
+        self.cpu = 0.0
+
+    async def async_start(self) -> None:
+        await self._async_spawn()
+        self._tasks.append(asyncio.get_running_loop().create_task(self._supervise()))
+
+    async def async_stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await self._async_kill()
+
+    def subscribe(self, topic: str) -> None:
+        self._subscriptions.add(topic)
+        self._send({"subscribe": topic})
+
+    def unsubscribe(self, topic: str) -> None:
+        self._subscriptions.discard(topic)
+        self._send({"unsubscribe": topic})
+
+    def publish(self, topic: str, payload: str) -> None:
+        self._send({"publish": [topic, payload]})
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "running": self._proc is not None and self._proc.returncode is None,
+            "restarts": self.restarts,
+            "cpu": round(self.cpu, 2),
+        }
+
+    def _send(self, cmd: dict[str, Any]) -> None:
+        if self._proc is not None and self._proc.stdin is not None and not self._proc.stdin.is_closing():
+            self._proc.stdin.write((json.dumps(cmd) + "\n").encode())
+
+    async def _async_spawn(self) -> None:
+        _LOGGER.info("Start ingestion worker")
+        self._proc = await asyncio.create_subprocess_exec(
+            sys.executable,
+            os.path.abspath(__file__),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        self._lastseen = time.monotonic()
+        self._send({"connect": self._connect})
+        for topic in self._subscriptions:
+            self._send({"subscribe": topic})
+        self._tasks.append(asyncio.get_running_loop().create_task(self._read(self._proc)))
+
+    async def _async_kill(self) -> None:
+        if (proc := self._proc) is None:
+            return
+        self._proc = None
+        if proc.returncode is None:
+            proc.stdin.close()
+            try:
+                await asyncio.wait_for(proc.wait(), 2)
+            except TimeoutError:
+                proc.kill()
+                await proc.wait()
+
+    async def _read(self, proc: asyncio.subprocess.Process) -> None:
+        while line := await proc.stdout.readline():
+            self._lastseen = time.monotonic()
+            try:
+                msg = json.loads(line)
+                if reports := msg.get("reports", None):
+                    self._on_reports(reports)
+                elif batteries := msg.get("battery", None):
+                    self._on_battery(batteries)
+                elif (cpu := msg.get("cpu", None)) is not None:
+                    self.cpu = cpu
+            except Exception as err:
+                _LOGGER.error(f"Error worker message: {err} => {line}")
+
+    async def _supervise(self) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            proc = self._proc
+            if proc is not None and proc.returncode is None and time.monotonic() - self._lastseen < HEARTBEAT_TIMEOUT:
+                continue
+            _LOGGER.error("Ingestion worker stopped, restarting")
+            await self._async_kill()
+            await asyncio.sleep(RESTART_DELAY)
+            self.restarts += 1
+            await self._async_spawn()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO, format="zendure worker %(levelname)s: %(message)s")
+    run()